@@ -1,18 +1,47 @@
 import asyncio
 import os
-import gc
 import io
+import sys
+import logging
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
 
 import numpy as np
 from pathlib import Path
-from pye57 import E57
+from pye57 import E57, libe57
 from datetime import datetime
 import laspy
-from scipy.spatial import cKDTree
+from numba import njit, prange, set_num_threads
 
-from tkinter import Tk, Label, Button, filedialog, StringVar, Entry, messagebox
+from tkinter import Tk, Label, Button, Checkbutton, filedialog, StringVar, BooleanVar, Entry, messagebox
 from tkinter.ttk import Progressbar
 
+# Log file written next to where the tool is run from, shared by the GUI and the worker processes
+LOG_FILE_NAME = "e57_scan_extractor.log"
+
+logger = logging.getLogger(__name__)
+
+# ProcessPoolExecutor refuses more worker processes than this on Windows
+WINDOWS_MAX_WORKERS = 61
+
+def configure_logging():
+    """
+    Sends log messages to the log file. Also used to set up logging in worker processes.
+    """
+    logging.basicConfig(filename=LOG_FILE_NAME, level=logging.INFO,
+                        format="%(asctime)s %(processName)s %(levelname)s %(message)s")
+
+def init_worker(numba_threads):
+    """
+    Sets up a worker process, limiting its Numba thread pool so the workers together do not oversubscribe the CPU.
+
+    Args:
+        numba_threads (int): Number of threads each worker's Numba kernels may use.
+    """
+    configure_logging()
+    set_num_threads(numba_threads)
+
 def create_directory_if_not_exist(directory_path):
     """
     Ensures a directory exists, creating it if necessary.
@@ -22,10 +51,344 @@ def create_directory_if_not_exist(directory_path):
     """
     dir_path = Path(directory_path)
     if not dir_path.exists():
-        print(f"Creating directory: {directory_path}")
+        logger.info("Creating directory: %s", directory_path)
         dir_path.mkdir(parents=True, exist_ok=True)
+
+@njit(parallel=True, cache=True, boundscheck=False, fastmath=True)
+def bounds_mask(x, y, z, min_x, max_x, min_y, max_y, min_z, max_z, out):
+    """
+    Flags the points that fall inside an axis-aligned box, in a single pass over the coordinates.
+
+    Args:
+        x (np.ndarray): X coordinates of the points.
+        y (np.ndarray): Y coordinates of the points.
+        z (np.ndarray): Z coordinates of the points.
+        min_x, max_x, min_y, max_y, min_z, max_z (float): Inclusive box limits.
+        out (np.ndarray): Boolean array the same length as the points to write the result into.
+    """
+    for i in prange(len(x)):
+        out[i] = ((x[i] >= min_x) & (x[i] <= max_x) &
+                  (y[i] >= min_y) & (y[i] <= max_y) &
+                  (z[i] >= min_z) & (z[i] <= max_z))
+
+@njit(cache=True, boundscheck=False)
+def mask_indices(mask, out):
+    """
+    Writes the indices of the set entries of a boolean mask into a preallocated buffer.
+
+    Args:
+        mask (np.ndarray): Boolean mask to scan.
+        out (np.ndarray): Integer array at least as long as the mask.
+
+    Returns:
+        int: Number of indices written to the start of `out`.
+    """
+    count = 0
+    for i in range(len(mask)):
+        if mask[i]:
+            out[count] = i
+            count += 1
+    return count
+
+@njit(cache=True, boundscheck=False)
+def gather_colors(red, green, blue, idx, out_red, out_green, out_blue):
+    """
+    Gathers the red, green and blue channels of the selected points in a single pass.
+
+    Args:
+        red, green, blue (np.ndarray): Color channels of the batch.
+        idx (np.ndarray): Indices of the points to gather.
+        out_red, out_green, out_blue (np.ndarray): Arrays the same length as `idx` to write the colors into.
+    """
+    for i in range(len(idx)):
+        j = idx[i]
+        out_red[i] = red[j]
+        out_green[i] = green[j]
+        out_blue[i] = blue[j]
+
+def scale_to_int32(values, scale, offset):
+    """
+    Converts coordinates to the raw int32 values stored in a LAS file.
+
+    Args:
+        values (np.ndarray): Coordinates to convert.
+        scale (float): LAS scale for the axis.
+        offset (float): LAS offset for the axis.
+
+    Returns:
+        np.ndarray: Scaled coordinates as int32.
+
+    Raises:
+        OverflowError: If a coordinate does not fit in int32 after applying the offset and scale.
+    """
+    scaled = np.rint((values - offset) / scale)
+    int32_info = np.iinfo(np.int32)
+    if len(scaled) and (scaled.min() < int32_info.min or scaled.max() > int32_info.max):
+        raise OverflowError("Values given do not fit after applying offset and scale")
+    return scaled.astype(np.int32)
+
+def grid_cells(x, y, z, spacing):
+    """
+    Computes the integer grid cell of each point on a spacing-sized grid anchored at the points' minimum.
+
+    Args:
+        x (np.ndarray): X coordinates of the points.
+        y (np.ndarray): Y coordinates of the points.
+        z (np.ndarray): Z coordinates of the points.
+        spacing (float): Edge length of the grid cells.
+
+    Returns:
+        tuple: Cell indices along X, Y and Z as int64 arrays.
+    """
+    return tuple(np.floor((axis - axis.min()) / spacing).astype(np.int64) for axis in (x, y, z))
+
+def voxel_thin(x, y, z, spacing, out=None):
+    """
+    Thins points on a voxel grid, keeping the first point that falls in each spacing-sized cell.
+
+    Args:
+        x (np.ndarray): X coordinates of the points.
+        y (np.ndarray): Y coordinates of the points.
+        z (np.ndarray): Z coordinates of the points.
+        spacing (float): Edge length of the voxel cells.
+        out (np.ndarray, optional): Boolean array the same length as the points to write the mask into.
+
+    Returns:
+        np.ndarray: Boolean mask of the points to keep.
+    """
+    cx, cy, cz = grid_cells(x, y, z, spacing)
+
+    # Sort points by cell instead of packing cells into one integer, so any grid size works;
+    # the sort is stable, so each cell's run starts with its first point
+    order = np.lexsort((cz, cy, cx))
+    sorted_cx, sorted_cy, sorted_cz = cx[order], cy[order], cz[order]
+    run_start = np.ones(len(x), dtype=bool)
+    run_start[1:] = (sorted_cx[1:] != sorted_cx[:-1]) | (sorted_cy[1:] != sorted_cy[:-1]) | (sorted_cz[1:] != sorted_cz[:-1])
+    first_idx = order[run_start]
+
+    mask = np.empty(len(x), dtype=bool) if out is None else out
+    mask[:] = False
+    mask[first_idx] = True
+    return mask
+
+# Edge length, in cells, of the tiles processed in parallel by the radius thinning kernel
+THIN_TILE_CELLS = 4
+
+@njit(cache=True, boundscheck=False)
+def _cell_order(cx, cy, cz, tile_cells):
+    """
+    Returns the tile and in-tile coordinates that cells are sorted by, keeping the cells of each tile contiguous.
+    """
+    return (cx // tile_cells, cy // tile_cells, cz // tile_cells,
+            cx % tile_cells, cy % tile_cells, cz % tile_cells)
+
+@njit(cache=True, boundscheck=False)
+def _find_cell(cell_keys, cx, cy, cz, tile_cells):
+    """
+    Binary searches the sorted occupied cells for a cell, returning its index or -1 if it is empty.
+
+    Cells are compared by their tile and in-tile coordinates rather than a single packed integer,
+    so any grid size works.
+    """
+    target = _cell_order(cx, cy, cz, tile_cells)
+    lo = 0
+    hi = len(cell_keys)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        order = 0
+        for axis in range(6):
+            if cell_keys[mid, axis] != target[axis]:
+                order = -1 if cell_keys[mid, axis] < target[axis] else 1
+                break
+        if order < 0:
+            lo = mid + 1
+        elif order > 0:
+            hi = mid
+        else:
+            return mid
+    return -1
+
+@njit(parallel=True, cache=True, boundscheck=False)
+def _radius_thin_kernel(x, y, z, cells, cell_keys, dims, cell_start, cell_count,
+                        tile_cell_start, color_tiles, color_start, tile_cells, spacing, keep):
+    """
+    Greedily eliminates points within `spacing` of a surviving point, writing the result into `keep`.
+
+    Tiles are processed in eight passes by the parity of their coordinates, so tiles handled
+    concurrently are at least one tile apart and never compete for the same points.
+    """
+    spacing_sq = spacing * spacing
+    for color in range(8):
+        for t in prange(color_start[color], color_start[color + 1]):
+            tile = color_tiles[t]
+            for c in range(tile_cell_start[tile], tile_cell_start[tile + 1]):
+                for i in range(cell_start[c], cell_start[c] + cell_count[c]):
+                    if not keep[i]:
+                        continue
+                    for dx in range(-1, 2):
+                        nx = cells[c, 0] + dx
+                        if nx < 0 or nx >= dims[0]:
+                            continue
+                        for dy in range(-1, 2):
+                            ny = cells[c, 1] + dy
+                            if ny < 0 or ny >= dims[1]:
+                                continue
+                            for dz in range(-1, 2):
+                                nz = cells[c, 2] + dz
+                                if nz < 0 or nz >= dims[2]:
+                                    continue
+                                j = _find_cell(cell_keys, nx, ny, nz, tile_cells)
+                                if j < 0:
+                                    continue
+                                for k in range(cell_start[j], cell_start[j] + cell_count[j]):
+                                    if k == i or not keep[k]:
+                                        continue
+                                    ddx = x[k] - x[i]
+                                    ddy = y[k] - y[i]
+                                    ddz = z[k] - z[i]
+                                    if ddx * ddx + ddy * ddy + ddz * ddz <= spacing_sq:
+                                        keep[k] = False
+
+def radius_thin(x, y, z, spacing, out=None):
+    """
+    Thins points so that no two kept points lie within `spacing` of each other.
+
+    Points are bucketed into a spatial hash grid with spacing-sized cells, so each point only
+    needs to be compared against the 27 cells surrounding it.
+
+    Args:
+        x (np.ndarray): X coordinates of the points.
+        y (np.ndarray): Y coordinates of the points.
+        z (np.ndarray): Z coordinates of the points.
+        spacing (float): Minimum distance between kept points.
+        out (np.ndarray, optional): Boolean array the same length as the points to write the mask into.
+
+    Returns:
+        np.ndarray: Boolean mask of the points to keep.
+    """
+    cx, cy, cz = grid_cells(x, y, z, spacing)
+    dims = np.array([cx.max() + 1, cy.max() + 1, cz.max() + 1])
+
+    # Sort points by tile, then by cell within the tile, so each cell is a contiguous run of points
+    tx, ty, tz, ix, iy, iz = _cell_order(cx, cy, cz, THIN_TILE_CELLS)
+    order = np.lexsort((iz, iy, ix, tz, ty, tx))
+    sorted_cx, sorted_cy, sorted_cz = cx[order], cy[order], cz[order]
+    new_cell = np.ones(len(x), dtype=bool)
+    new_cell[1:] = (sorted_cx[1:] != sorted_cx[:-1]) | (sorted_cy[1:] != sorted_cy[:-1]) | (sorted_cz[1:] != sorted_cz[:-1])
+    cell_start = np.flatnonzero(new_cell)
+    cell_count = np.diff(np.append(cell_start, len(x)))
+    cells = np.stack((sorted_cx[cell_start], sorted_cy[cell_start], sorted_cz[cell_start]), axis=1)
+    cell_keys = np.stack(_cell_order(cells[:, 0], cells[:, 1], cells[:, 2], THIN_TILE_CELLS), axis=1)
+
+    # Group cells by tile, then tiles by the parity of their tile coordinates
+    tile_coords = cell_keys[:, :3]
+    new_tile = np.ones(len(cells), dtype=bool)
+    new_tile[1:] = np.any(tile_coords[1:] != tile_coords[:-1], axis=1)
+    tile_cell_start = np.append(np.flatnonzero(new_tile), len(cells))
+    tile_coords = tile_coords[new_tile]
+    colors = (tile_coords[:, 0] & 1) * 4 + (tile_coords[:, 1] & 1) * 2 + (tile_coords[:, 2] & 1)
+    color_tiles = np.argsort(colors, kind='stable')
+    color_start = np.searchsorted(colors[color_tiles], np.arange(9))
+
+    keep = np.ones(len(x), dtype=bool)
+    _radius_thin_kernel(x[order], y[order], z[order], cells, cell_keys, dims, cell_start, cell_count,
+                        tile_cell_start, color_tiles, color_start, THIN_TILE_CELLS, spacing, keep)
+
+    mask = np.empty(len(x), dtype=bool) if out is None else out
+    mask[order] = keep
+    return mask
+
+def read_scan_batches(e57_file, scan_index, batch_size):
+    """
+    Streams the points of a scan in batches, reusing one set of read buffers for the whole scan.
+
+    Batches match what `E57.read_scan` would return: invalid points are dropped and coordinates
+    are converted to cartesian and transformed by the scan pose into global coordinates. Only the
+    intensity and color channels present in the scan are read, with colors returned as uint16.
+
+    Args:
+        e57_file (E57): Open E57 file to read from.
+        scan_index (int): Index of the scan to read.
+        batch_size (int): Maximum number of points per batch.
+
+    Yields:
+        dict: Point field arrays for the batch. The arrays are only valid until the next batch is read.
+    """
+    scan_header = e57_file.get_header(scan_index)
+    cartesian = all(field in scan_header.point_fields for field in ('cartesianX', 'cartesianY', 'cartesianZ'))
+    if cartesian:
+        fields = ['cartesianX', 'cartesianY', 'cartesianZ']
+        invalid_state_field = 'cartesianInvalidState'
     else:
-        print(f"Directory already exists: {directory_path}")
+        fields = ['sphericalRange', 'sphericalAzimuth', 'sphericalElevation']
+        invalid_state_field = 'sphericalInvalidState'
+    fields += [field for field in ('intensity', 'colorRed', 'colorGreen', 'colorBlue', invalid_state_field)
+               if field in scan_header.point_fields]
+
+    # Colors are read straight into uint16 buffers, the type LAS stores them as
+    buffers_data = {}
+    buffers = libe57.VectorSourceDestBuffer()
+    for field in fields:
+        if field in ('colorRed', 'colorGreen', 'colorBlue'):
+            data = np.empty(batch_size, dtype=np.uint16)
+            buffer = libe57.SourceDestBuffer(e57_file.image_file, field, data, batch_size, True, True)
+        else:
+            data, buffer = e57_file.make_buffer(field, batch_size)
+        buffers_data[field] = data
+        buffers.append(buffer)
+    rotation_matrix = scan_header.rotation_matrix if scan_header.has_pose() else None
+    translation = scan_header.translation
+
+    reader = scan_header.points.reader(buffers)
+    try:
+        while True:
+            count = reader.read()
+            if count == 0:
+                break
+
+            batch = {field: data[:count] for field, data in buffers_data.items()}
+            if invalid_state_field in batch:
+                valid = batch.pop(invalid_state_field) == 0
+                batch = {field: data[valid] for field, data in batch.items()}
+
+            if not cartesian:
+                ranges = batch.pop('sphericalRange')
+                azimuths = batch.pop('sphericalAzimuth')
+                elevations = batch.pop('sphericalElevation')
+                range_cos_elevation = ranges * np.cos(elevations)
+                batch['cartesianX'] = range_cos_elevation * np.cos(azimuths)
+                batch['cartesianY'] = range_cos_elevation * np.sin(azimuths)
+                batch['cartesianZ'] = ranges * np.sin(elevations)
+
+            if rotation_matrix is not None:
+                x, y, z = batch['cartesianX'], batch['cartesianY'], batch['cartesianZ']
+                for axis, field in enumerate(('cartesianX', 'cartesianY', 'cartesianZ')):
+                    batch[field] = (rotation_matrix[axis, 0] * x + rotation_matrix[axis, 1] * y +
+                                    rotation_matrix[axis, 2] * z + translation[axis])
+
+            yield batch
+    finally:
+        reader.close()
+
+def compress_las(las_path, laz_path, chunk_size=1000000):
+    """
+    Compresses a LAS file to LAZ in chunks and removes the uncompressed file.
+
+    If compression fails, the partial LAZ file is removed and the LAS file is kept.
+
+    Args:
+        las_path (Path): Path to the uncompressed LAS file.
+        laz_path (Path): Path to write the compressed LAZ file to.
+        chunk_size (int): Number of points to compress at a time.
+    """
+    try:
+        with laspy.open(las_path) as reader, laspy.open(laz_path, mode='w', header=reader.header) as writer:
+            for points in reader.chunk_iterator(chunk_size):
+                writer.write_points(points)
+    except BaseException:
+        Path(laz_path).unlink(missing_ok=True)
+        raise
+    os.remove(las_path)
 
 def select_files():
     """
@@ -36,7 +399,7 @@ def select_files():
         filetypes=[("E57 files", "*.e57"), ("All files", "*.*")]
     )
     if paths:
-        selected_paths.set(paths)
+        selected_paths_list[:] = list(paths)
         input_path.set(f"{len(paths)} file(s) selected")
     else:
         input_path.set("No files selected")
@@ -45,8 +408,7 @@ def start_processing():
     """
     Validates user input and starts the async processing of selected E57 files.
     """
-    paths_str = selected_paths.get()
-    if not paths_str:
+    if not selected_paths_list:
         messagebox.showerror("Error", "No files selected for processing!")
         return
 
@@ -54,230 +416,372 @@ def start_processing():
     try:
         bounds_radius = float(bounds_radius_var.get())
         spacing = float(spacing_var.get())
+        exact_spacing = exact_spacing_var.get()
         if bounds_radius <= 0 or spacing <= 0:
             raise ValueError("Bounds radius and spacing must be positive numbers.")
     except ValueError as e:
         messagebox.showerror("Error", f"Invalid input: {e}")
         return
 
-    try:
-        paths_str = paths_str.strip("[]")
-        paths_list = [path.strip(" '").strip("('").strip("')") for path in paths_str.split(",")]
-    except Exception as e:
-        messagebox.showerror("Error", f"Failed to parse file paths: {e}")
-        return
-
     # Replace the label with a progress bar during processing
     entry.pack_forget()
     progress_bar.pack(pady=10)
 
     # Run the processing with the user-defined bounds and spacing
-    asyncio.run(extract_scans(paths_list, progress_bar, bounds_radius, spacing))
+    failures = asyncio.run(extract_scans(selected_paths_list, progress_bar, bounds_radius, spacing, exact_spacing))
 
     # Reset the UI after processing
     progress_bar.pack_forget()
     entry.pack(pady=10)
-    messagebox.showinfo("Success", "Processing complete!")
+    if failures:
+        messagebox.showwarning("Warning", f"Processing complete, but {len(failures)} file(s) or scan(s) failed:\n" +
+                               "\n".join(failures) + f"\n\nSee {LOG_FILE_NAME} for details.")
+    else:
+        messagebox.showinfo("Success", "Processing complete!")
 
-async def extract_scans(file_paths, progress_bar, bounds_radius, spacing):
+async def extract_scans(file_paths, progress_bar, bounds_radius, spacing, exact_spacing=False):
     """
     Extracts scans from E57 files, applying bounds and spacing filters, and saves them as LAZ files.
 
+    Scans are processed in parallel across a pool of worker processes, one scan per task.
+
     Args:
         file_paths (list): List of file paths to process.
         progress_bar (Progressbar): Progress bar to update.
         bounds_radius (float): Bounding radius for cropping points.
         spacing (float): Minimum spacing between points during thinning.
+        exact_spacing (bool): Thin by true point-to-point distance instead of a voxel grid.
+
+    Returns:
+        list: Names of the files and scans that failed; the others are still extracted.
     """
+    failures = []
     if not file_paths:
-        print("No files selected.")
-        return
+        logger.warning("No files selected.")
+        return failures
 
     # Define the output directory
     output_path = Path(file_paths[0]).parent / "output"
     create_directory_if_not_exist(output_path)
 
-    # Ensure the coords file exists
-    coords_file_path = Path(output_path) / "coords.csv"
-    if not coords_file_path.exists():
-        print(f"Creating coords file: {coords_file_path}")
-        with open(coords_file_path, 'w') as f:
-            f.write("origin_name,scan_name,scan_path,creation_date,translation_x,translation_y,translation_z," +
-                    "rotation_x,rotation_y,rotation_z,rotation_w,scale_x,scale_y,scale_z,offset_x,offset_y,offset_z\n")
-
-    # Initialize progress tracking
-    current_progress = [0]
-    progress_bar["maximum"] = len(file_paths)
-
-    # Process each file
+    # Open the coords file once, writing the header if it is new
+    coords_file_path = output_path / "coords.csv"
+    e57_file_paths = []
+    seen_file_paths = set()
     for file_path in file_paths:
         if not file_path.endswith('.e57'):
-            print(f"Skipping non-E57 file: {file_path}")
+            logger.warning("Skipping non-E57 file: %s", file_path)
             continue
-        await process_e57_file(file_path, output_path, coords_file_path, progress_bar, current_progress, bounds_radius, spacing)
-
-async def process_e57_file(file_path, output_path, coords_file_path, progress_bar, current_progress, bounds_radius, spacing):
+        resolved_path = Path(file_path).resolve()
+        if resolved_path in seen_file_paths:
+            logger.warning("Skipping duplicate E57 file: %s", file_path)
+            continue
+        seen_file_paths.add(resolved_path)
+        e57_file_paths.append(file_path)
+
+    # Read the file headers concurrently on worker threads to list every scan of every file
+    file_scan_jobs = await asyncio.gather(*(
+        asyncio.to_thread(process_e57_file, file_path, output_path, bounds_radius, spacing, exact_spacing)
+        for file_path in e57_file_paths), return_exceptions=True)
+    scan_jobs = []
+    for file_path, file_result in zip(e57_file_paths, file_scan_jobs):
+        if isinstance(file_result, BaseException):
+            logger.error("Failed to read E57 file %s", file_path, exc_info=file_result)
+            failures.append(file_path)
+        else:
+            scan_jobs.extend(file_result)
+    if not scan_jobs:
+        return failures
+
+    # Give scans that would share an output file, such as same-named scans or files, a unique name
+    used_las_file_names = set()
+    for scan_job in scan_jobs:
+        las_file_name = scan_job['las_file_name']
+        stem, suffix = os.path.splitext(las_file_name)
+        duplicate_count = 1
+        while las_file_name.lower() in used_las_file_names:
+            duplicate_count += 1
+            las_file_name = f"{stem}-{duplicate_count}{suffix}"
+        if las_file_name != scan_job['las_file_name']:
+            logger.warning("Renaming output %s to %s to avoid overwriting another scan", scan_job['las_file_name'], las_file_name)
+        scan_job['las_file_name'] = las_file_name
+        used_las_file_names.add(las_file_name.lower())
+
+    # Split the cores between worker processes and the Numba threads inside each of them
+    max_workers = os.cpu_count()
+    if sys.platform == "win32":
+        max_workers = min(max_workers, WINDOWS_MAX_WORKERS)
+    num_workers = max(1, min(max_workers, len(scan_jobs)))
+    numba_threads = max(1, os.cpu_count() // num_workers)
+
+    with open(coords_file_path, 'a') as coords_file, ProcessPoolExecutor(max_workers=num_workers, initializer=init_worker, initargs=(numba_threads,)) as executor:
+        if coords_file.tell() == 0:
+            logger.info("Creating coords file: %s", coords_file_path)
+            coords_file.write("origin_name,scan_name,scan_path,creation_date,translation_x,translation_y,translation_z," +
+                              "rotation_x,rotation_y,rotation_z,rotation_w,scale_x,scale_y,scale_z,offset_x,offset_y,offset_z\n")
+            coords_file.flush()
+
+        loop = asyncio.get_running_loop()
+        extracting = {loop.run_in_executor(executor, partial(process_scan, **scan_job)): scan_job for scan_job in scan_jobs}
+        compressing = {}
+
+        # Compress each scan as soon as it has been extracted, updating the progress bar as each scan finishes
+        progress_bar["maximum"] = len(scan_jobs)
+        completed = 0
+        pending = set(extracting)
+        while pending:
+            # Wake up regularly so the window keeps redrawing while scans are processed
+            done, pending = await asyncio.wait(pending, timeout=0.1, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                if future in extracting:
+                    scan_job = extracting.pop(future)
+                    try:
+                        raw_las_path, coords_row = future.result()
+                    except Exception:
+                        logger.exception("Failed to extract scan %s", scan_job['las_file_name'])
+                        failures.append(scan_job['las_file_name'])
+                    else:
+                        compress_future = loop.run_in_executor(executor, compress_las, raw_las_path, raw_las_path.with_suffix(".laz"))
+                        compressing[compress_future] = (raw_las_path, coords_row)
+                        pending.add(compress_future)
+                        continue
+                else:
+                    raw_las_path, coords_row = compressing.pop(future)
+                    try:
+                        future.result()
+                    except Exception:
+                        logger.exception("Failed to compress %s, leaving the uncompressed file in place", raw_las_path)
+                        failures.append(raw_las_path.name)
+                    else:
+                        # Record each scan as soon as its file is finished, so earlier scans survive later failures
+                        coords_file.write(coords_row)
+                        coords_file.flush()
+                completed += 1
+                progress_bar["value"] = completed
+            progress_bar.update_idletasks()
+
+    return failures
+
+def process_e57_file(file_path, output_path, bounds_radius, spacing, exact_spacing=False):
     """
-    Processes an individual E57 file and extracts scans as LAZ files.
+    Reads the header of an individual E57 file and lists its scans for extraction as LAZ files.
 
     Args:
         file_path (str): Path to the E57 file.
         output_path (Path): Directory to save output files.
-        coords_file_path (Path): Path to the coordinates CSV file.
-        progress_bar (Progressbar): Progress bar to update.
-        current_progress (list): List to track progress.
         bounds_radius (float): Bounding radius for cropping points.
         spacing (float): Minimum spacing between points during thinning.
+        exact_spacing (bool): Thin by true point-to-point distance instead of a voxel grid.
+
+    Returns:
+        list: Keyword arguments for `process_scan` for each scan.
     """
     # Ensure the file exists before processing
     if not os.path.exists(file_path):
-        print(f"E57 file not found at path: {file_path}")
+        logger.error("E57 file not found at path: %s", file_path)
         raise FileNotFoundError(f"E57 file not found at path: {file_path}")
 
     e57_file = E57(str(file_path))
-    e57_file_name = os.path.splitext(os.path.basename(file_path))[0]
-    num_scans = e57_file.scan_count
     imf = e57_file.image_file
     root = imf.root()
     creation_datetime = datetime.fromtimestamp(root['creationDateTime']["dateTimeValue"].value())
     formatted_datetime = creation_datetime.strftime("%Y-%m-%d %H:%M:%S")
+    scan_names = [e57_file.get_header(scan_index)['name'].value() for scan_index in range(e57_file.scan_count)]
+    e57_file.close()
+
+    e57_file_name = os.path.splitext(os.path.basename(file_path))[0]
+
+    return [dict(file_path=file_path, scan_index=scan_index, output_path=output_path,
+                 las_file_name=f"{e57_file_name}-{name}.laz", e57_file_name=e57_file_name,
+                 formatted_datetime=formatted_datetime, bounds_radius=bounds_radius,
+                 spacing=spacing, exact_spacing=exact_spacing)
+            for scan_index, name in enumerate(scan_names)]
+
+def process_scan(file_path, scan_index, output_path, las_file_name, e57_file_name, formatted_datetime, bounds_radius, spacing, exact_spacing=False):
+    """
+    Extracts a single scan of an E57 file as a LAZ file. Runs in a worker process.
 
-    for scan_index in range(num_scans):
-        # Extract point cloud
-        scan_header = e57_file.get_header(scan_index)
-        translation = scan_header.translation
-        rotation = scan_header.rotation
-        guid = scan_header['guid'].value()
-        name = scan_header['name'].value()
-
-        bounds = {
-            'maxX': float(translation[0]) + bounds_radius,
-            'maxY': float(translation[1]) + bounds_radius,
-            'maxZ': float(translation[2]) + bounds_radius,
-            'minX': float(translation[0]) - bounds_radius,
-            'minY': float(translation[1]) - bounds_radius,
-            'minZ': float(translation[2]) - bounds_radius
-        }
-
-        scales = (
-            scan_header['cartesianXScaling'].value() if 'cartesianXScaling' in scan_header else 0.001,
-            scan_header['cartesianYScaling'].value() if 'cartesianYScaling' in scan_header else 0.001,
-            scan_header['cartesianZScaling'].value() if 'cartesianZScaling' in scan_header else 0.001
-        )
-
-        offsets = (
-            scan_header['cartesianXOffset'].value() if 'cartesianXOffset' in scan_header else 0.0,
-            scan_header['cartesianYOffset'].value() if 'cartesianYOffset' in scan_header else 0.0,
-            scan_header['cartesianZOffset'].value() if 'cartesianZOffset' in scan_header else 0.0
-        )
-
-        # Create LAS header
-        header = laspy.LasHeader(point_format=3, version="1.4")
-        header.scales = scales
-        header.offsets = offsets
-
-        las_file_name = f"{e57_file_name}-{name}.laz"
-        las_full_path = Path(output_path) / las_file_name
-
-        scan = e57_file.read_scan(scan_index, intensity=True, colors=True, ignore_missing_fields=True)
-
-        # Open LAS file for writing in batches
-        with laspy.open(las_full_path, mode='w', header=header) as writer:
-            num_points = len(scan['cartesianX'])
-            batch_size = 1000000  # Batch size of 1 million points
-
-            # Process points in batches
-            for start_idx in range(0, num_points, batch_size):
-                end_idx = min(start_idx + batch_size, num_points)
-                print(f"Processing batch: {start_idx} to {end_idx}")
-
-                # Extract the current batch of points
-                point_batch = np.vstack((scan['cartesianX'][start_idx:end_idx],
-                                         scan['cartesianY'][start_idx:end_idx],
-                                         scan['cartesianZ'][start_idx:end_idx])).T
-
-                # Apply cropping filters
-                x_filter = (point_batch[:, 0] >= bounds['minX']) & (point_batch[:, 0] <= bounds['maxX'])
-                y_filter = (point_batch[:, 1] >= bounds['minY']) & (point_batch[:, 1] <= bounds['maxY'])
-                z_filter = (point_batch[:, 2] >= bounds['minZ']) & (point_batch[:, 2] <= bounds['maxZ'])
-                valid_points_filter = x_filter & y_filter & z_filter
-
-                if np.any(valid_points_filter):
-                    cropped_points = point_batch[valid_points_filter]
-
-                    # Apply thinning logic
-                    tree = cKDTree(cropped_points)
-                    mask = np.ones(len(cropped_points), dtype=bool)
-
-                    for i, point in enumerate(cropped_points):
-                        if mask[i]:
-                            indices = tree.query_ball_point(point, spacing)
-                            mask[indices[1:]] = False  # Keep only the first point, discard nearby points
-
-                    thinned_points = cropped_points[mask]
-
-                    # Create ScaleAwarePointRecord for the thinned points
-                    point_record = laspy.ScaleAwarePointRecord.zeros(len(thinned_points), point_format=header.point_format, scales=header.scales, offsets=header.offsets)
-
-                    # Assign x, y, z values to the record
-                    point_record.x = thinned_points[:, 0]
-                    point_record.y = thinned_points[:, 1]
-                    point_record.z = thinned_points[:, 2]
-
-                    # Handle optional attributes like intensity and color if they exist
-                    if 'intensity' in scan:
-                        point_record.intensity = scan['intensity'][start_idx:end_idx][valid_points_filter][mask].astype(np.uint16)
-
-                    if 'colorRed' in scan:
-                        point_record.red = scan['colorRed'][start_idx:end_idx][valid_points_filter][mask].astype(np.uint16)
-                        point_record.green = scan['colorGreen'][start_idx:end_idx][valid_points_filter][mask].astype(np.uint16)
-                        point_record.blue = scan['colorBlue'][start_idx:end_idx][valid_points_filter][mask].astype(np.uint16)
-
-                    # Write the thinned points to the LAZ file
-                    writer.write_points(point_record)
-
-                # Free memory by deleting batch-specific variables and forcing garbage collection
-                del point_batch, valid_points_filter, cropped_points, thinned_points, point_record
-                gc.collect()
-
-        with open(coords_file_path, 'a') as f:
-            f.write(f"{e57_file_name},{las_file_name},{las_full_path},{formatted_datetime},{translation[0]},{translation[1]},{translation[2]},"
-                    f"{rotation[1]},{rotation[2]},{rotation[3]},{rotation[0]},{scales[0]},{scales[1]},{scales[2]},{offsets[0]},{offsets[1]},{offsets[2]}\n")
+    Args:
+        file_path (str): Path to the E57 file.
+        scan_index (int): Index of the scan to extract.
+        output_path (Path): Directory to save output files.
+        las_file_name (str): Name of the LAZ file to write.
+        e57_file_name (str): Name of the E57 file without its extension.
+        formatted_datetime (str): Creation date of the E57 file, as written to the coords file.
+        bounds_radius (float): Bounding radius for cropping points.
+        spacing (float): Minimum spacing between points during thinning.
+        exact_spacing (bool): Thin by true point-to-point distance instead of a voxel grid.
+
+    Returns:
+        tuple: Path of the uncompressed LAS file written, and the row describing the scan for the coords CSV file.
+    """
+    e57_file = E57(str(file_path))
+    # Extract point cloud
+    scan_header = e57_file.get_header(scan_index)
+    translation = scan_header.translation
+    rotation = scan_header.rotation
+    guid = scan_header['guid'].value()
+
+    bounds = {
+        'maxX': float(translation[0]) + bounds_radius,
+        'maxY': float(translation[1]) + bounds_radius,
+        'maxZ': float(translation[2]) + bounds_radius,
+        'minX': float(translation[0]) - bounds_radius,
+        'minY': float(translation[1]) - bounds_radius,
+        'minZ': float(translation[2]) - bounds_radius
+    }
+
+    scales = (
+        scan_header['cartesianXScaling'].value() if 'cartesianXScaling' in scan_header else 0.001,
+        scan_header['cartesianYScaling'].value() if 'cartesianYScaling' in scan_header else 0.001,
+        scan_header['cartesianZScaling'].value() if 'cartesianZScaling' in scan_header else 0.001
+    )
+
+    offsets = (
+        scan_header['cartesianXOffset'].value() if 'cartesianXOffset' in scan_header else 0.0,
+        scan_header['cartesianYOffset'].value() if 'cartesianYOffset' in scan_header else 0.0,
+        scan_header['cartesianZOffset'].value() if 'cartesianZOffset' in scan_header else 0.0
+    )
+
+    # Create LAS header
+    header = laspy.LasHeader(point_format=3, version="1.4")
+    header.scales = scales
+    header.offsets = offsets
+
+    las_full_path = Path(output_path) / las_file_name
+
+    # Points are written uncompressed here and compressed to LAZ by a separate task afterwards
+    raw_las_path = las_full_path.with_suffix(".las")
+
+    batch_size = 1000000  # Batch size of 1 million points
+    max_pending_writes = 2  # Batches allowed to queue up for writing before reading waits
+
+    try:
+        # Open LAS file for writing in batches, writing on a background thread
+        with laspy.open(raw_las_path, mode='w', header=header) as writer, ThreadPoolExecutor(max_workers=1) as write_executor:
+            pending_writes = deque()
+            valid_buffer = np.empty(batch_size, dtype=bool)
+            index_buffer = np.empty(batch_size, dtype=np.int64)
+            mask_buffer = np.empty(batch_size, dtype=bool)
+            num_batches = num_points = num_kept_points = 0
+
+            # Stream points in batches
+            for scan in read_scan_batches(e57_file, scan_index, batch_size):
+                num_batches += 1
+                num_points += len(scan['cartesianX'])
+
+                # Extract the current batch of points as per-axis views
+                x = scan['cartesianX']
+                y = scan['cartesianY']
+                z = scan['cartesianZ']
+                if len(x) == 0:
+                    continue
+
+                # Compare the batch's extent against the bounds, so batches fully inside or outside them skip the crop
+                min_x, max_x, min_y, max_y, min_z, max_z = x.min(), x.max(), y.min(), y.max(), z.min(), z.max()
+                if (max_x < bounds['minX'] or min_x > bounds['maxX'] or
+                        max_y < bounds['minY'] or min_y > bounds['maxY'] or
+                        max_z < bounds['minZ'] or min_z > bounds['maxZ']):
+                    continue
+
+                # Gather the cropped points
+                if (min_x >= bounds['minX'] and max_x <= bounds['maxX'] and
+                        min_y >= bounds['minY'] and max_y <= bounds['maxY'] and
+                        min_z >= bounds['minZ'] and max_z <= bounds['maxZ']):
+                    # The whole batch lies inside the bounds, so the crop would keep every point
+                    cropped_idx = np.arange(len(x))
+                else:
+                    # Apply cropping filters
+                    valid_points_filter = valid_buffer[:len(x)]
+                    bounds_mask(x, y, z, bounds['minX'], bounds['maxX'], bounds['minY'], bounds['maxY'],
+                                bounds['minZ'], bounds['maxZ'], valid_points_filter)
+
+                    cropped_idx = index_buffer[:mask_indices(valid_points_filter, index_buffer)]
+                    if len(cropped_idx) == 0:
+                        continue
+
+                cropped_x = x[cropped_idx]
+                cropped_y = y[cropped_idx]
+                cropped_z = z[cropped_idx]
+
+                # Apply thinning logic, either exact radius-based or one point per spacing-sized voxel
+                if exact_spacing:
+                    mask = radius_thin(cropped_x, cropped_y, cropped_z, spacing, out=mask_buffer[:len(cropped_idx)])
+                else:
+                    mask = voxel_thin(cropped_x, cropped_y, cropped_z, spacing, out=mask_buffer[:len(cropped_idx)])
+
+                # Create a packed point record for the thinned points
+                point_record = laspy.PackedPointRecord.zeros(np.count_nonzero(mask), point_format=header.point_format)
+
+                # Assign x, y, z values to the record, scaling them to the raw integers stored in the file
+                point_record.X = scale_to_int32(cropped_x[mask], scales[0], offsets[0])
+                point_record.Y = scale_to_int32(cropped_y[mask], scales[1], offsets[1])
+                point_record.Z = scale_to_int32(cropped_z[mask], scales[2], offsets[2])
+
+                # Handle optional attributes like intensity and color if they exist, gathered with one index
+                final_idx = cropped_idx[mask]
+                if 'intensity' in scan:
+                    point_record.intensity = scan['intensity'][final_idx].astype(np.uint16)
+
+                if 'colorRed' in scan:
+                    gather_colors(scan['colorRed'], scan['colorGreen'], scan['colorBlue'], final_idx,
+                                  point_record.array['red'], point_record.array['green'], point_record.array['blue'])
+
+                # Write the thinned points to the LAS file while the next batch is processed
+                num_kept_points += len(point_record)
+                pending_writes.append(write_executor.submit(writer.write_points, point_record))
+                if len(pending_writes) > max_pending_writes:
+                    pending_writes.popleft().result()
+
+            # Wait for the remaining batches to be written, surfacing any write errors
+            for pending_write in pending_writes:
+                pending_write.result()
+    except BaseException:
+        # Don't leave a partial file behind that could be mistaken for a finished scan
+        e57_file.close()
+        raw_las_path.unlink(missing_ok=True)
+        raise
 
     e57_file.close()
+    logger.info("Extracted %s: kept %d of %d points in %d batches", las_file_name, num_kept_points, num_points, num_batches)
+
+    coords_values = (*translation, rotation[1], rotation[2], rotation[3], rotation[0], *scales, *offsets)
+    coords_row = ",".join((e57_file_name, las_file_name, str(las_full_path), formatted_datetime, *map(str, coords_values)))
+    return raw_las_path, coords_row + "\n"
+
+if __name__ == "__main__":
+    configure_logging()
 
-    # Update the progress bar after processing each file
-    current_progress[0] += 1
-    progress_bar["value"] = current_progress[0]
-    progress_bar.update_idletasks()
+    # GUI Setup
+    root = Tk()
+    root.title("E57 Scan Extractor")
 
-# GUI Setup
-root = Tk()
-root.title("E57 Scan Extractor")
+    input_path = StringVar()
+    selected_paths_list = []
+    bounds_radius_var = StringVar(value="10")  # Default value for bounds radius
+    spacing_var = StringVar(value="0.005")    # Default value for spacing
+    exact_spacing_var = BooleanVar(value=False)
 
-input_path = StringVar()
-selected_paths = StringVar()
-bounds_radius_var = StringVar(value="10")  # Default value for bounds radius
-spacing_var = StringVar(value="0.005")    # Default value for spacing
+    # GUI Components
+    Label(root, text="Select E57 files:").pack(pady=10)
+    entry = Label(root, textvariable=input_path, width=50, relief="sunken", anchor="w")
+    entry.pack(pady=5)
 
-# GUI Components
-Label(root, text="Select E57 files:").pack(pady=10)
-entry = Label(root, textvariable=input_path, width=50, relief="sunken", anchor="w")
-entry.pack(pady=5)
+    Label(root, text="Bounds Radius (meters):").pack(pady=5)
+    bounds_radius_entry = Entry(root, textvariable=bounds_radius_var, width=20)
+    bounds_radius_entry.pack(pady=5)
 
-Label(root, text="Bounds Radius (meters):").pack(pady=5)
-bounds_radius_entry = Entry(root, textvariable=bounds_radius_var, width=20)
-bounds_radius_entry.pack(pady=5)
+    Label(root, text="Spacing (meters):").pack(pady=5)
+    spacing_entry = Entry(root, textvariable=spacing_var, width=20)
+    spacing_entry.pack(pady=5)
 
-Label(root, text="Spacing (meters):").pack(pady=5)
-spacing_entry = Entry(root, textvariable=spacing_var, width=20)
-spacing_entry.pack(pady=5)
+    Checkbutton(root, text="Exact spacing (slower)", variable=exact_spacing_var).pack(pady=5)
 
-progress_bar = Progressbar(root, orient="horizontal", mode="determinate", length=300)
+    progress_bar = Progressbar(root, orient="horizontal", mode="determinate", length=300)
 
-Button(root, text="Select Files", command=select_files).pack(pady=5)
-Button(root, text="Start Processing", command=start_processing).pack(pady=10)
+    Button(root, text="Select Files", command=select_files).pack(pady=5)
+    Button(root, text="Start Processing", command=start_processing).pack(pady=10)
 
-# Start the GUI
-root.geometry("400x300")
-root.mainloop()
+    # Start the GUI
+    root.geometry("400x340")
+    root.mainloop()
@@ -0,0 +1,214 @@
+import asyncio
+import csv
+import sys
+from pathlib import Path
+
+import laspy
+import numpy as np
+import pye57
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from extractor import extract_scans, grid_cells, radius_thin, read_scan_batches, voxel_thin
+
+
+def pairwise_distances(a, b):
+    return np.linalg.norm(a[:, None, :] - b[None, :, :], axis=2)
+
+
+def random_points(n, seed=0, extent=1.0):
+    rng = np.random.default_rng(seed)
+    return rng.uniform(-extent, extent, (n, 3))
+
+
+def write_e57(path, scan_names, n=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    e57_file = pye57.E57(str(path), mode='w')
+    for scan_index, name in enumerate(scan_names):
+        data = {
+            'cartesianX': rng.uniform(-2, 2, n),
+            'cartesianY': rng.uniform(-2, 2, n),
+            'cartesianZ': rng.uniform(-2, 2, n),
+            'intensity': rng.uniform(0, 1, n).astype(np.float32),
+        }
+        e57_file.write_scan_raw(data, name=name, translation=np.array([float(scan_index), 0.0, 0.0]),
+                                rotation=np.array([1.0, 0.0, 0.0, 0.0]))
+    e57_file.close()
+    return str(path)
+
+
+class StubProgressBar:
+    def __init__(self):
+        self.values = {}
+
+    def __setitem__(self, key, value):
+        self.values[key] = value
+
+    def __getitem__(self, key):
+        return self.values[key]
+
+    def update(self):
+        pass
+
+    def update_idletasks(self):
+        pass
+
+
+def run_extract_scans(file_paths, bounds_radius=10.0, spacing=0.1):
+    progress_bar = StubProgressBar()
+    failures = asyncio.run(extract_scans(file_paths, progress_bar, bounds_radius, spacing))
+    return failures, progress_bar
+
+
+def read_coords(output_path):
+    with open(output_path / "coords.csv", newline='') as coords_file:
+        return list(csv.DictReader(coords_file))
+
+
+@pytest.fixture
+def work_dir(tmp_path, monkeypatch):
+    # Keep the log file written by the tool out of the repository
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+DEGENERATE_POINTS = {
+    "single point": np.array([[1.0, 2.0, 3.0]]),
+    "identical points": np.full((50, 3), 7.5),
+    "flat axis": np.column_stack((random_points(500, seed=1)[:, :2], np.full(500, 2.0))),
+}
+
+
+@pytest.mark.parametrize("spacing", [0.05, 0.2, 0.5])
+def test_radius_thin_keeps_no_two_points_within_spacing(spacing):
+    points = random_points(3000)
+    mask = radius_thin(points[:, 0], points[:, 1], points[:, 2], spacing)
+
+    kept = points[mask]
+    distances = pairwise_distances(kept, kept)
+    np.fill_diagonal(distances, np.inf)
+    assert distances.min() > spacing * (1 - 1e-9)
+
+
+@pytest.mark.parametrize("spacing", [0.05, 0.2, 0.5])
+def test_radius_thin_drops_only_points_near_a_kept_point(spacing):
+    points = random_points(3000)
+    mask = radius_thin(points[:, 0], points[:, 1], points[:, 2], spacing)
+
+    distances = pairwise_distances(points[~mask], points[mask])
+    assert np.all(distances.min(axis=1) <= spacing * (1 + 1e-9))
+
+
+@pytest.mark.parametrize("spacing", [0.05, 0.2, 0.5])
+def test_voxel_thin_keeps_one_point_per_occupied_cell(spacing):
+    points = random_points(3000)
+    mask = voxel_thin(points[:, 0], points[:, 1], points[:, 2], spacing)
+
+    cells = np.stack(grid_cells(points[:, 0], points[:, 1], points[:, 2], spacing), axis=1)
+    kept_cells = cells[mask]
+    assert len(np.unique(kept_cells, axis=0)) == len(kept_cells)
+    assert len(kept_cells) == len(np.unique(cells, axis=0))
+
+
+def test_thinning_writes_into_out():
+    points = random_points(1000)
+    for thin in (radius_thin, voxel_thin):
+        out = np.ones(len(points), dtype=bool)
+        mask = thin(points[:, 0], points[:, 1], points[:, 2], 0.2, out=out)
+        assert mask is out
+        np.testing.assert_array_equal(out, thin(points[:, 0], points[:, 1], points[:, 2], 0.2))
+
+
+@pytest.mark.parametrize("thin", [radius_thin, voxel_thin])
+def test_thinning_handles_grids_too_large_to_index(thin):
+    # A 3 km extent at 1 mm spacing has more cells than fit in a 64-bit index
+    x = np.array([0.0, 3000.0, 1500.0, 1500.0005, 1500.0])
+    y = np.array([0.0, 3000.0, 1500.0, 1500.0, 1500.003])
+    z = np.array([0.0, 3000.0, 1500.0, 1500.0, 1500.0])
+    mask = thin(x, y, z, 0.001)
+
+    np.testing.assert_array_equal(mask, [True, True, True, False, True])
+
+
+@pytest.mark.parametrize("name", DEGENERATE_POINTS)
+@pytest.mark.parametrize("thin", [radius_thin, voxel_thin])
+def test_thinning_handles_degenerate_inputs(thin, name):
+    points = DEGENERATE_POINTS[name]
+    spacing = 0.1
+    mask = thin(points[:, 0], points[:, 1], points[:, 2], spacing)
+
+    assert mask.dtype == bool and len(mask) == len(points)
+    assert mask.any()
+    if name != "flat axis":
+        # Every point lies in one cell, so exactly one survives
+        assert np.count_nonzero(mask) == 1
+    elif thin is radius_thin:
+        kept = points[mask]
+        distances = pairwise_distances(kept, kept)
+        np.fill_diagonal(distances, np.inf)
+        assert distances.min() > spacing * (1 - 1e-9)
+
+
+@pytest.mark.parametrize("batch_size", [1000, 4096, 100000])
+def test_read_scan_batches_matches_read_scan_for_posed_scan(tmp_path, batch_size):
+    rng = np.random.default_rng(2)
+    n = 10000
+    data = {
+        'cartesianX': rng.uniform(-5, 5, n),
+        'cartesianY': rng.uniform(-5, 5, n),
+        'cartesianZ': rng.uniform(-5, 5, n),
+        'intensity': rng.uniform(0, 1, n).astype(np.float32),
+        'colorRed': rng.integers(0, 256, n).astype(np.uint8),
+        'colorGreen': rng.integers(0, 256, n).astype(np.uint8),
+        'colorBlue': rng.integers(0, 256, n).astype(np.uint8),
+        'cartesianInvalidState': (rng.random(n) < 0.1).astype(np.int8),
+    }
+    rotation = np.array([0.9, 0.1, 0.3, 0.2])
+    rotation /= np.linalg.norm(rotation)
+
+    e57_path = str(tmp_path / "posed.e57")
+    e57_file = pye57.E57(e57_path, mode='w')
+    e57_file.write_scan_raw(data, name="posed", translation=np.array([3.0, 4.0, 5.0]), rotation=rotation)
+    e57_file.close()
+
+    e57_file = pye57.E57(e57_path)
+    try:
+        expected = e57_file.read_scan(0, intensity=True, colors=True, ignore_missing_fields=True)
+        batches = [{field: values.copy() for field, values in batch.items()}
+                   for batch in read_scan_batches(e57_file, 0, batch_size)]
+    finally:
+        e57_file.close()
+
+    assert all(len(batch['cartesianX']) <= batch_size for batch in batches)
+    for field in expected:
+        actual = np.concatenate([batch[field] for batch in batches])
+        np.testing.assert_allclose(actual, expected[field], err_msg=field)
+
+
+def test_extract_scans_gives_clashing_output_names_a_suffix(work_dir):
+    (work_dir / "other").mkdir()
+    first = write_e57(work_dir / "site.e57", ["scan", "Scan"])
+    second = write_e57(work_dir / "other" / "site.e57", ["scan"], seed=1)
+
+    failures, progress_bar = run_extract_scans([first, second])
+
+    assert failures == []
+    assert progress_bar["value"] == progress_bar["maximum"] == 3
+    output_path = work_dir / "output"
+    assert sorted(path.name for path in output_path.glob("*.laz")) == ["site-Scan-2.laz", "site-scan-3.laz", "site-scan.laz"]
+    assert not list(output_path.glob("*.las"))
+    assert sorted(row['scan_name'] for row in read_coords(output_path)) == ["site-Scan-2.laz", "site-scan-3.laz", "site-scan.laz"]
+
+
+def test_extract_scans_skips_repeated_paths(work_dir):
+    e57_path = write_e57(work_dir / "site.e57", ["scan"])
+
+    failures, _ = run_extract_scans([e57_path, e57_path, str(work_dir / "." / "site.e57")])
+
+    assert failures == []
+    output_path = work_dir / "output"
+    assert [path.name for path in output_path.glob("*.laz")] == ["site-scan.laz"]
+    assert len(read_coords(output_path)) == 1
+    with laspy.open(output_path / "site-scan.laz") as reader:
+        assert reader.header.point_count > 0